@@ -0,0 +1,262 @@
+"""Local stand-in for the ServiceNow Table API, for offline benchmarks.
+
+Serves synthetic incident, sc_task, problem and sys_user_group rows under
+/api/now/table/<name> and understands the parts of the protocol the dashboard
+uses: sysparm_query (^-joined =, !=, <, <=, >, >=, IN and ORDERBY terms),
+sysparm_fields, sysparm_limit/sysparm_offset and the X-Total-Count header.
+/api/now/stats/<name> answers sysparm_count with sysparm_group_by, and
+sysparm_min_fields.
+Terms on fields the mock does not generate (e.g. dotted references other than
+the generated ones) are ignored. Latency and 429/503 errors can be injected.
+
+    python bench/mock_servicenow.py --rows 100000 --port 8080 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from servicenow_api import INCIDENT_FIELDS, REQUEST_FIELDS  # noqa: E402
+
+PRESETS_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "assignment_groups.json")
+PROBLEM_FIELDS = "number,short_description,state,priority,impact,category,assignment_group.name,opened_at,closed_at,sys_created_on,sys_updated_on"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TERM = re.compile(r"^([a-zA-Z0-9_.]+?)(>=|<=|!=|=|>|<|IN)(.*)$")
+
+
+def group_sys_id(name):
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+def assignment_groups():
+    with open(PRESETS_PATH, encoding="utf-8") as f:
+        presets = json.load(f)
+    names = sorted({name for names in presets.values() for name in names})
+    return pd.DataFrame({"sys_id": [group_sys_id(name) for name in names], "name": names})
+
+
+def generate_tickets(rows, prefix, fields, groups, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now().floor("s")
+    opened = now - pd.to_timedelta(rng.integers(0, days * 86400, rows), unit="s")
+    is_closed = rng.random(rows) < 0.85
+    closed = opened + pd.to_timedelta(rng.integers(600, 30 * 86400, rows), unit="s")
+    closed = pd.Series(closed).where(is_closed & (closed <= now))
+    updated = closed.fillna(pd.Series(opened))
+    group = rng.integers(0, len(groups), rows)
+    people = np.array([f"user{i:03d}" for i in range(200)])
+
+    columns = {
+        "sys_id": [f"{i:032x}" for i in rng.permutation(rows)],
+        "number": [f"{prefix}{i:07d}" for i in range(rows)],
+        "state": rng.choice(["1", "2", "3", "6", "7"], rows),
+        "priority": rng.choice(["1", "2", "3", "4"], rows, p=[0.02, 0.1, 0.5, 0.38]),
+        "impact": rng.choice(["1", "2", "3"], rows),
+        "category": rng.choice(["software", "hardware", "network", "database", "inquiry"], rows),
+        "short_description": [f"Synthetic ticket {i}" for i in range(rows)],
+        "business_service.name": rng.choice(["SAP", "Salesforce", "Email", "LIMS", "Oracle"], rows),
+        "u_prob_type": rng.choice(["Application", "Data", "Access"], rows),
+        "assignment_group": groups["sys_id"].to_numpy()[group],
+        "assignment_group.name": groups["name"].to_numpy()[group],
+        "opened_at": pd.Series(opened).dt.strftime(DATETIME_FORMAT),
+        "sys_created_on": pd.Series(opened).dt.strftime(DATETIME_FORMAT),
+        "closed_at": closed.dt.strftime(DATETIME_FORMAT).fillna(""),
+        "sys_updated_on": updated.dt.strftime(DATETIME_FORMAT),
+    }
+    for role in ("closed_by", "assigned_to"):
+        person = people[rng.integers(0, len(people), rows)]
+        columns[f"{role}.user_name"] = person
+        columns[f"{role}.name"] = np.char.add("Synthetic ", person)
+        columns[f"{role}.employee_number"] = np.char.add("E", person)
+    wanted = ["sys_id", "assignment_group"] + fields.split(",")
+    return pd.DataFrame({name: columns[name] for name in wanted if name in columns})
+
+
+class MockInstance:
+    # The generated tables plus the knobs the request handler reads
+    def __init__(self, rows=10000, latency=0.0, error_rate=0.0, seed=0):
+        groups = assignment_groups()
+        # Ticket tables are generated on first use, a 1M row table is large
+        self.generators = {
+            "incident": lambda: generate_tickets(rows, "INC", INCIDENT_FIELDS, groups, seed=seed),
+            "sc_task": lambda: generate_tickets(rows, "SCTASK", REQUEST_FIELDS, groups, seed=seed + 1),
+            "problem": lambda: generate_tickets(max(rows // 10, 1), "PRB", PROBLEM_FIELDS, groups, seed=seed + 2),
+            "sys_user_group": lambda: groups,
+        }
+        self.tables = {}
+        self.latency = latency
+        self.error_rate = error_rate
+        # Off: answer like an instance that does not send X-Total-Count
+        self.total_count = True
+        self.matches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def table(self, table_name):
+        with self.lock:
+            if table_name not in self.tables:
+                self.tables[table_name] = self.generators[table_name]()
+            return self.tables[table_name]
+
+    def select(self, table_name, query):
+        # Row positions matching the query, cached so paging does not refilter
+        key = (table_name, query)
+        with self.lock:
+            if key in self.matches:
+                self.matches.move_to_end(key)
+                return self.matches[key]
+        table = self.table(table_name)
+        mask = np.ones(len(table), dtype=bool)
+        orders = []
+        for term in filter(None, query.split("^")):
+            if term.startswith("ORDERBY"):
+                orders.append(term[len("ORDERBY"):])
+                continue
+            match = TERM.match(term)
+            if match is None or match.group(1) not in table.columns:
+                continue
+            field, op, value = match.groups()
+            column = table[field]
+            if op == "IN":
+                mask &= column.isin(value.split(",")).to_numpy()
+            elif op == "=":
+                mask &= (column == value).to_numpy()
+            elif op == "!=":
+                mask &= (column != value).to_numpy()
+            else:
+                # Timestamps are fixed width strings, so they compare as text
+                mask &= {
+                    ">=": column >= value, "<=": column <= value, ">": column > value, "<": column < value,
+                }[op].to_numpy() & (column != "").to_numpy()
+        positions = np.flatnonzero(mask)
+        # The first ORDERBY term is the primary key: stable sorts, last term first
+        for order in reversed(orders):
+            descending = order.startswith("DESC")
+            field = order[len("DESC"):] if descending else order
+            if field in table.columns:
+                values = table[field].to_numpy()[positions]
+                if descending:
+                    positions = positions[::-1]
+                    values = values[::-1]
+                positions = positions[np.argsort(values, kind="stable")]
+                if descending:
+                    positions = positions[::-1]
+        with self.lock:
+            self.matches[key] = positions
+            while len(self.matches) > 32:
+                self.matches.popitem(last=False)
+        return positions
+
+    def page(self, table_name, params):
+        query = params.get("sysparm_query", [""])[0]
+        fields = params.get("sysparm_fields", [""])[0]
+        limit = int(params.get("sysparm_limit", ["10000"])[0])
+        offset = int(params.get("sysparm_offset", ["0"])[0])
+        table = self.table(table_name)
+        positions = self.select(table_name, query)
+        columns = [name for name in fields.split(",") if name in table.columns] if fields else list(table.columns)
+        rows = table.iloc[positions[offset:offset + limit]][columns].to_dict("records")
+        return rows, len(positions)
+
+    def stats(self, table_name, params):
+        # Aggregate API count, grouped like ServiceNow returns it
+        query = params.get("sysparm_query", [""])[0]
+        group_by = [name for name in params.get("sysparm_group_by", [""])[0].split(",") if name]
+        table = self.table(table_name)
+        positions = self.select(table_name, query)
+        if not group_by:
+            stats = {"count": str(len(positions))}
+            min_fields = [name for name in params.get("sysparm_min_fields", [""])[0].split(",") if name]
+            if min_fields:
+                values = table.iloc[positions]
+                stats["min"] = {name: values.loc[values[name] != "", name].min() if len(values) else "" for name in min_fields}
+            return {"stats": stats}
+        counts = table.iloc[positions].groupby(group_by, observed=True).size()
+        return [
+            {
+                "stats": {"count": str(count)},
+                "groupby_fields": [
+                    {"field": field, "value": value}
+                    for field, value in zip(group_by, values if isinstance(values, tuple) else (values,))
+                ],
+            }
+            for values, count in counts.items()
+        ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    instance = None
+
+    def do_GET(self):
+        instance = self.instance
+        if instance.latency:
+            time.sleep(instance.latency)
+        if instance.error_rate and random.random() < instance.error_rate:
+            self.send_json(random.choice([429, 503]), {"error": {"message": "injected"}}, {"Retry-After": "1"})
+            return
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[:2] != ["api", "now"] or parts[2] not in ("table", "stats") or parts[3] not in instance.generators:
+            self.send_json(404, {"error": {"message": "No such table"}})
+            return
+        params = parse_qs(url.query, keep_blank_values=True)
+        if parts[2] == "stats":
+            self.send_json(200, {"result": instance.stats(parts[3], params)})
+            return
+        rows, total = instance.page(parts[3], params)
+        self.send_json(200, {"result": rows}, {"X-Total-Count": str(total)} if instance.total_count else None)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(instance, host="127.0.0.1", port=0):
+    # Starts the server on a daemon thread, returns it and its Table API base URL
+    handler = type("BoundHandler", (Handler,), {"instance": instance})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/now/table"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 429/503")
+    args = parser.parse_args()
+    instance = MockInstance(args.rows, args.latency, args.error_rate)
+    server, base_url = serve(instance, port=args.port)
+    print(f"Serving {args.rows} rows per ticket table, API_ENDPOINT = \"{base_url}\"")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Offline benchmarks for the ServiceNow client and the dashboard analytics.
+
+Starts the local mock instance (bench/mock_servicenow.py) for each dataset
+size and reports, per stage, wall time and peak Python memory (tracemalloc):
+
+    download   raw transfer of every page, no decoding (network baseline)
+    fetch      ServiceNowAPI.fetch_window: paged HTTP + streaming JSON decode
+    frame      typed DataFrame construction from the decoded columns
+    aggregate  totals, per-period opened/closed/resolution rate and backlog
+    figures    the three Plotly figures
+
+    python bench/run_benchmarks.py --rows 10000 100000 --json bench_output.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from streamlit import config, logger  # noqa: E402
+
+# Running outside `streamlit run`: keep its "no runtime" warnings quiet. The
+# config is parsed first, parsing it resets the log level.
+config.get_config_options()
+logger.set_log_level("error")
+
+from mock_servicenow import MockInstance, serve  # noqa: E402
+from records import build_frame  # noqa: E402
+from servicenow_api import INCIDENT_FIELDS, PAGE_SIZE, ServiceNowAPI  # noqa: E402
+from ticket_analytics import TICKET_SPECS, TicketAnalytics  # noqa: E402
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+SCOPE = "assignment_group.u_provider_rollup=IBM"
+
+
+class Stage:
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1] - self.start_memory
+        self.results.append({"stage": self.name, "seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2)})
+
+
+def download(api, start_date, end_date):
+    # Same pages as the client asks for (through its session, so with the same
+    # retries), bodies read and thrown away
+    url = f"{api.base_url}/incident?sysparm_fields={INCIDENT_FIELDS}&sysparm_query={SCOPE}^opened_at>={start_date}^opened_at<={end_date}^ORDERBYopened_at^ORDERBYsys_id"
+    size = 0
+    offset = 0
+    while True:
+        response = api.session.get(f"{url}&sysparm_limit={PAGE_SIZE}&sysparm_offset={offset}")
+        response.raise_for_status()
+        size += len(response.content)
+        offset += PAGE_SIZE
+        if offset >= int(response.headers["X-Total-Count"]):
+            return size
+
+
+def mock_process(rows, latency, error_rate, ready):
+    instance = MockInstance(rows, latency, error_rate)
+    instance.table("incident")  # generate up front, not inside the timings
+    server, base_url = serve(instance)
+    ready.put(base_url)
+    threading.Event().wait()
+
+
+def run(rows, latency, error_rate):
+    # The mock runs in its own process so its work and memory stay out of the numbers
+    ready = multiprocessing.Queue()
+    mock = multiprocessing.Process(target=mock_process, args=(rows, latency, error_rate, ready), daemon=True)
+    mock.start()
+    base_url = ready.get(timeout=1800)
+    config = {
+        "API_ENDPOINT": base_url, "USER_NAME": "bench", "PASSWORD": "bench",
+        "SYNC_DB_PATH": "", "REQUESTS_PER_SECOND": 0, "BACKOFF_FACTOR": 0.1,
+    }
+    api = ServiceNowAPI(config=config)
+    start_date = "2000-01-01 00:00:00"
+    end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+    results = []
+    try:
+        with Stage("download", results):
+            body_bytes = download(api, start_date, end_date)
+        with Stage("fetch", results):
+            records = api.fetch_window("incident", INCIDENT_FIELDS, SCOPE, start_date, end_date)
+        with Stage("frame", results):
+            df = build_frame(records)
+        del records
+        analytics = TicketAnalytics(TICKET_SPECS[0], df, start_date, end_date)
+        with Stage("aggregate", results):
+            analytics.total_opened, analytics.total_closed, analytics.periods, analytics.backlog
+        with Stage("figures", results):
+            analytics.opened_closed_figure, analytics.resolution_figure, analytics.backlog_figure
+    finally:
+        mock.terminate()
+    return {
+        "rows": len(df),
+        "response_mb": round(body_bytes / 2**20, 2),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 2**20, 2),
+        "stages": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock adds to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests the mock answers 429/503")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    reports = []
+    for rows in args.rows:
+        report = run(rows, args.latency, args.error_rate)
+        reports.append(report)
+        print(f"\n{report['rows']} rows, {report['response_mb']} MB over the wire, {report['frame_mb']} MB as a DataFrame")
+        print(f"{'stage':<10} {'seconds':>10} {'peak MB':>10}")
+        for stage in report["stages"]:
+            print(f"{stage['stage']:<10} {stage['seconds']:>10.3f} {stage['peak_mb']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from bucketing import GRANULARITIES, period_label
+
+
+def sorted_times(values):
+    times = pd.to_datetime(pd.Series(values), errors="coerce").dropna()
+    return np.sort(times.to_numpy(dtype="datetime64[ns]"))
+
+
+def backlog_series(opened, closed, granularity="W", end=None):
+    # Open tickets at the end of every period from the first opened ticket up
+    # to `end` (today by default): opened so far minus closed so far. Both
+    # sides are sorted once and every period boundary is a binary search, so
+    # this is O((rows + periods) log rows) instead of a scan per period.
+    period_freq, range_freq, label = GRANULARITIES[granularity]
+    opened_times = sorted_times(opened)
+    closed_times = sorted_times(closed)
+    if len(opened_times) == 0:
+        return pd.DataFrame({label: pd.Series(dtype=str), "Backlog": pd.Series(dtype=int)})
+
+    first = pd.Timestamp(opened_times[0]).to_period(period_freq).start_time
+    last = pd.Timestamp(end) if end is not None else pd.Timestamp.today()
+    starts = pd.date_range(start=first, end=last.normalize(), freq=range_freq)
+    # A period covers everything before the start of the next one
+    boundaries = (starts.to_period(period_freq) + 1).start_time.to_numpy(dtype="datetime64[ns]")
+
+    opened_to_date = np.searchsorted(opened_times, boundaries, side="left")
+    closed_to_date = np.searchsorted(closed_times, boundaries, side="left")
+    return pd.DataFrame({
+        label: period_label(starts, granularity),
+        "Backlog": opened_to_date - closed_to_date,
+    })
+
+
+def backlog_from_counts(opened, closed, granularity="W", end=None):
+    # backlog_series from per-period counts (period start -> tickets) instead
+    # of the tickets themselves, as the Aggregate API returns them
+    period_freq, range_freq, label = GRANULARITIES[granularity]
+    opened = opened[opened > 0].groupby(level=0).sum().sort_index()
+    if len(opened) == 0:
+        return pd.DataFrame({label: pd.Series(dtype=str), "Backlog": pd.Series(dtype=int)})
+
+    last = pd.Timestamp(end) if end is not None else pd.Timestamp.today()
+    starts = pd.date_range(start=opened.index[0], end=last.normalize(), freq=range_freq)
+    opened_to_date = opened.cumsum().reindex(starts, method="ffill").fillna(0)
+    closed_to_date = closed.groupby(level=0).sum().sort_index().cumsum().reindex(starts, method="ffill").fillna(0)
+    return pd.DataFrame({
+        label: period_label(starts, granularity),
+        "Backlog": (opened_to_date - closed_to_date).astype(int).to_numpy(),
+    })
@@ -0,0 +1,75 @@
+import pandas as pd
+
+# granularity -> (period alias, date_range alias, label column)
+GRANULARITIES = {
+    "D": ("D", "D", "Day"),
+    "W": ("W", "W-MON", "Week"),
+    "M": ("M", "MS", "Month"),
+    "Q": ("Q", "QS", "Quarter"),
+}
+
+# Charts covering more periods than this are rolled up to the next coarser
+# granularity (week -> month -> quarter), see chart_granularity
+MAX_CHART_PERIODS = 60
+
+
+def period_start(times, granularity="W"):
+    # Start of the period each timestamp falls in (Monday 00:00 for weeks),
+    # computed on the whole column at once. NaT stays NaT.
+    times = pd.to_datetime(times, errors="coerce")
+    days = times.dt.normalize()
+    if granularity == "D":
+        return days
+    if granularity == "W":
+        return days - pd.to_timedelta(times.dt.dayofweek, unit="D")
+    if granularity == "M":
+        return days - pd.to_timedelta(times.dt.day - 1, unit="D")
+    if granularity == "Q":
+        return times.dt.to_period("Q").dt.start_time
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def period_label(starts, granularity="W"):
+    # Labels are only built for the aggregated rows, never per ticket
+    starts = pd.DatetimeIndex(starts)
+    if granularity == "W":
+        return starts.strftime("%Y-%m-%d") + " to " + (starts + pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+    if granularity == "M":
+        return starts.strftime("%Y-%m")
+    if granularity == "Q":
+        return starts.to_period("Q").strftime("%Y-Q%q")
+    return starts.strftime("%Y-%m-%d")
+
+
+def period_range(start, end, granularity="W"):
+    # Starts of every period from the one `start` falls in up to `end`
+    period_freq, range_freq, _ = GRANULARITIES[granularity]
+    first = pd.Timestamp(start).to_period(period_freq).start_time
+    return pd.date_range(first, pd.Timestamp(end), freq=range_freq)
+
+
+def chart_granularity(start, end, max_periods=MAX_CHART_PERIODS):
+    # Finest of week, month and quarter that draws start..end in at most
+    # max_periods points
+    for granularity in ("W", "M", "Q"):
+        if len(period_range(start, end, granularity)) <= max_periods:
+            return granularity
+    return "Q"
+
+
+def period_counts(opened, closed, granularity="W"):
+    # Opened and closed tickets per period, aggregated on the period start and
+    # labelled afterwards (e.g. "2025-04-14 to 2025-04-20" for weeks)
+    return labelled_counts(
+        period_start(opened, granularity).value_counts(),
+        period_start(closed, granularity).value_counts(),
+        granularity,
+    )
+
+
+def labelled_counts(opened, closed, granularity="W"):
+    # Opened/closed counts indexed by period start -> one labelled row per period
+    label = GRANULARITIES[granularity][2]
+    combined = pd.concat([opened.rename("Opened"), closed.rename("Closed")], axis=1).fillna(0).astype(int).sort_index()
+    combined.insert(0, label, period_label(combined.index, granularity))
+    return combined.reset_index(drop=True)
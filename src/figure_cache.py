@@ -0,0 +1,45 @@
+import hashlib
+import threading
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+from cachetools import LRUCache
+
+FIGURE_CACHE_SIZE = 256
+
+
+def frame_digest(df):
+    # Content hash of an aggregated frame: same values, same columns, same digest
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    # Plotly figures shared by every session, stored as their JSON and keyed
+    # on the chart kind plus the hash of the data drawn. Rebuilding a figure
+    # from JSON skips plotly.express entirely.
+    def __init__(self, maxsize):
+        self.cache = LRUCache(maxsize=maxsize)
+        self.lock = threading.Lock()
+
+    def get_or_build(self, name, data, build):
+        key = (name, frame_digest(data))
+        with self.lock:
+            serialized = self.cache.get(key)
+        if serialized is not None:
+            return pio.from_json(serialized)
+        fig = build(data)
+        with self.lock:
+            self.cache[key] = fig.to_json()
+        return fig
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+@st.cache_resource
+def get_figure_cache(maxsize=FIGURE_CACHE_SIZE):
+    return FigureCache(maxsize)
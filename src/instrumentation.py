@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+import streamlit as st
+
+logger = logging.getLogger("servicenow.metrics")
+
+
+class NullStage:
+    # What a disabled Metrics hands out: no clock reads, no allocations
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **values):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    def __init__(self, metrics, name, labels, memory):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.values = {}
+        self.memory = memory and tracemalloc.is_tracing()
+
+    def __enter__(self):
+        if self.memory:
+            tracemalloc.reset_peak()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        record = {"stage": self.name, **self.labels, "seconds": round(seconds, 6), **self.values}
+        if self.memory:
+            # tracemalloc is process wide: with loads running in parallel this is
+            # the peak of everything allocated meanwhile, not just this stage
+            record["peak_bytes"] = max(tracemalloc.get_traced_memory()[1] - self.start_memory, 0)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.metrics.add(record)
+        return False
+
+    def set(self, **values):
+        # rows, bytes, ... known only once the stage has run
+        self.values.update(values)
+
+
+class MemoryTracing:
+    # tracemalloc is process wide, so is the switch: it only changes when
+    # someone flips it, never as a side effect of another session's rerun.
+    # Tracing slows every allocation down, it is off unless asked for.
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return tracemalloc.is_tracing()
+
+    def set(self, enabled):
+        with self.lock:
+            if enabled and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif not enabled and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+@st.cache_resource
+def get_memory_tracing():
+    return MemoryTracing()
+
+
+class Metrics:
+    # Timings (and, while memory tracing is on, memory) of the fetch and
+    # analytics stages for one session. Disabled it costs one attribute check
+    # per stage.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+        self.lock = threading.Lock()
+
+    def stage(self, name, memory=False, **labels):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, labels, memory)
+
+    def add(self, record):
+        record["time"] = time.time()
+        with self.lock:
+            self.records.append(record)
+        logger.info(json.dumps(record))
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+
+    def to_json_lines(self):
+        with self.lock:
+            return "".join(json.dumps(record) + "\n" for record in self.records)
+
+    def to_prometheus(self, prefix="servicenow_dashboard"):
+        # Text exposition format, one series per stage/table
+        seconds = defaultdict(float)
+        counts = defaultdict(int)
+        totals = defaultdict(int)
+        peaks = defaultdict(int)
+        with self.lock:
+            for record in self.records:
+                key = (record["stage"], record.get("table", ""))
+                seconds[key] += record["seconds"]
+                counts[key] += 1
+                for name in ("rows", "bytes"):
+                    if name in record:
+                        totals[key + (name,)] += record[name]
+                if "peak_bytes" in record:
+                    peaks[key] = max(peaks[key], record["peak_bytes"])
+
+        def labels(stage, table):
+            return f'stage="{stage}",table="{table}"'
+
+        lines = [
+            f"# TYPE {prefix}_stage_seconds summary",
+            *(f"{prefix}_stage_seconds_sum{{{labels(*key)}}} {value:.6f}" for key, value in seconds.items()),
+            *(f"{prefix}_stage_seconds_count{{{labels(*key)}}} {value}" for key, value in counts.items()),
+        ]
+        for name in ("rows", "bytes"):
+            series = [(key[:2], value) for key, value in totals.items() if key[2] == name]
+            if series:
+                lines.append(f"# TYPE {prefix}_stage_{name}_total counter")
+                lines += [f"{prefix}_stage_{name}_total{{{labels(*key)}}} {value}" for key, value in series]
+        if peaks:
+            lines.append(f"# TYPE {prefix}_stage_peak_memory_bytes gauge")
+            lines += [f"{prefix}_stage_peak_memory_bytes{{{labels(*key)}}} {value}" for key, value in peaks.items()]
+        return "\n".join(lines) + "\n"
+
+
+DISABLED = Metrics()
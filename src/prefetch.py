@@ -0,0 +1,56 @@
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from presets import compile_filter
+from servicenow_api import ServiceNowAPI
+from ticket_analytics import TICKET_SPECS
+
+PREFETCH_INTERVAL = 240
+
+
+def default_window():
+    # Same range the date pickers start on: today, midnight to midnight
+    today = datetime.now().date()
+    start_date = datetime.combine(today, datetime.min.time()).strftime("%Y-%m-%d %H:%M:%S")
+    end_date = datetime.combine(today, datetime.max.time()).strftime("%Y-%m-%d %H:%M:%S")
+    return start_date, end_date
+
+
+class Prefetcher(threading.Thread):
+    # Background thread that keeps the shared query cache warm for the default
+    # date range and the given assignment group presets, so the first click
+    # of the day (and of every cache period) does not wait on ServiceNow.
+    # Presets are compiled every round: the group lookup may have fallen back
+    # to names, and group membership changes over time.
+    def __init__(self, presets, interval):
+        super().__init__(name="servicenow-prefetch", daemon=True)
+        self.presets = presets
+        self.interval = interval
+        self.last_run = None
+        self.last_error = None
+
+    def run(self):
+        api = ServiceNowAPI(refresh_cache=True)
+        while True:
+            start_date, end_date = default_window()
+            queries = [compile_filter(api, preset) for preset in self.presets]
+            for spec in TICKET_SPECS:
+                # Unfiltered tables (Problems) are the same for every preset, load them once
+                for paramquery in queries if spec.filtered else queries[:1]:
+                    try:
+                        spec.loader(api, start_date, end_date, paramquery)
+                    except Exception as e:  # keep the loop alive, the next round retries
+                        self.last_error = f"{spec.key}: {e}"
+            self.last_run = datetime.now()
+            time.sleep(self.interval)
+
+
+@st.cache_resource
+def start_prefetcher(presets, interval=PREFETCH_INTERVAL):
+    # One scheduler per server process and preset list, whichever session starts it first
+    prefetcher = Prefetcher(list(presets), interval)
+    prefetcher.start()
+    return prefetcher
@@ -0,0 +1,79 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+import streamlit as st
+
+from servicenow_api import FetchError
+
+PRESETS_PATH = os.path.join(os.path.dirname(__file__), "assignment_groups.json")
+
+# Longest IN-list put into one encoded query, bigger presets are split into
+# sub-queries that are fetched in parallel and merged
+MAX_IN_LIST_CHARS = 2000
+GROUP_LOOKUP_CHUNK = 40
+
+
+def load_presets(path=PRESETS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+ASSIGNMENT_GROUP_PRESETS = load_presets()
+PRESET_OPTIONS = ["All"] + list(ASSIGNMENT_GROUP_PRESETS)
+
+
+def in_list(names):
+    # Group names are put in the URL as they are, "&" and friends must be escaped
+    return ",".join(quote(name, safe=" -_.()/") for name in names)
+
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def resolve_group_ids(_api, base_url, names):
+    # sys_ids of the named assignment groups, looked up once a day per instance
+    chunks = [names[i:i + GROUP_LOOKUP_CHUNK] for i in range(0, len(names), GROUP_LOOKUP_CHUNK)]
+
+    def lookup(chunk):
+        params = f"?sysparm_fields=sys_id,name&sysparm_query=nameIN{in_list(chunk)}"
+        return _api.fetch_pages("sys_user_group", params).get("sys_id")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        return sorted({sys_id for ids in pool.map(lookup, chunks) for sys_id in ids if sys_id})
+
+
+def split_in_list(field, values, max_chars=MAX_IN_LIST_CHARS):
+    queries = []
+    chunk = []
+    size = 0
+    for value in values:
+        if chunk and size + len(value) + 1 > max_chars:
+            queries.append(f"{field}IN{','.join(chunk)}")
+            chunk, size = [], 0
+        chunk.append(value)
+        size += len(value) + 1
+    if chunk:
+        queries.append(f"{field}IN{','.join(chunk)}")
+    return queries
+
+
+def compile_filter(api, preset, priority=""):
+    # Encoded queries for a preset/priority selection. Presets are matched on
+    # assignment_group sys_ids rather than on the long group names; a list
+    # with more than one query means the results have to be merged.
+    if preset in ASSIGNMENT_GROUP_PRESETS:
+        names = ASSIGNMENT_GROUP_PRESETS[preset]
+        try:
+            group_ids = resolve_group_ids(api, api.base_url, names)
+            queries = split_in_list("assignment_group", group_ids)
+        except (FetchError, requests.RequestException):
+            # Lookup failed, fall back to matching on the names themselves
+            queries = split_in_list("assignment_group.name", [in_list([name]) for name in names])
+        if not queries:
+            queries = [f"assignment_group.nameIN{in_list(names)}"]
+    else:
+        queries = [""]
+    if priority:
+        queries = [f"priority={priority}^{query}" if query else f"priority={priority}" for query in queries]
+    return queries
@@ -0,0 +1,79 @@
+import re
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+import streamlit as st
+from cachetools import TTLCache
+
+
+def normalize_query(query):
+    # Same filter, same key: drop blank terms and sort the values of IN lists
+    terms = []
+    for term in (query or "").split("^"):
+        term = term.strip()
+        if not term:
+            continue
+        field, sep, values = term.partition("IN")
+        if sep and re.fullmatch(r"[a-z0-9_.]+", field):
+            term = field + sep + ",".join(sorted(v.strip() for v in values.split(",")))
+        terms.append(term)
+    return "^".join(terms)
+
+
+def result_size(result):
+    # In-memory footprint used to bound the cache, only frames are cached
+    if not isinstance(result, pd.DataFrame):
+        raise TypeError(f"Only DataFrames can be cached, not {type(result).__name__}")
+    return int(result.memory_usage(deep=True).sum())
+
+
+class QueryCache:
+    # Results shared by every session for `ttl` seconds, evicted least
+    # recently used once `max_bytes` is reached. Identical loads that arrive
+    # while one is already running wait for it instead of calling ServiceNow.
+    def __init__(self, ttl, max_bytes):
+        self.cache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=result_size)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get_or_load(self, key, loader, refresh=False):
+        # refresh=True reloads even if the entry is still fresh (prefetching)
+        with self.lock:
+            if not refresh and key in self.cache:
+                return self.cache[key]
+            future = self.in_flight.get(key)
+            if future is None:
+                future = self.in_flight[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            result = loader()
+            with self.lock:
+                # Empty results are not kept, a failed fetch is retried on the next load
+                if len(result) > 0:
+                    try:
+                        self.cache[key] = result
+                    except ValueError:
+                        pass  # larger than the whole cache
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+        future.set_result(result)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+@st.cache_resource
+def get_query_cache(ttl, max_bytes):
+    return QueryCache(ttl, max_bytes)
@@ -0,0 +1,123 @@
+import codecs
+import json
+import re
+
+import pandas as pd
+
+CATEGORY_FIELDS = {"state", "priority", "assignment_group.name", "category"}
+SMALL_INT_FIELDS = {"impact"}
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+RESULT_START = re.compile(r'"result"\s*:\s*\[')
+SEPARATORS = " \t\r\n,"
+
+
+def iter_results(response, chunk_size=64 * 1024):
+    # Yields the objects of the {"result": [...]} array as they come off the
+    # wire, so the whole body never has to be held as text or parsed at once.
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = None
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buffer += text.decode(chunk)
+        if pos is None:
+            match = RESULT_START.search(buffer)
+            if match is None:
+                continue
+            pos = match.end()
+        while True:
+            while pos < len(buffer) and buffer[pos] in SEPARATORS:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                row, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # the object continues in the next chunk
+            yield row
+        buffer = buffer[pos:]
+        pos = 0
+
+
+class RecordColumns:
+    # Rows kept column by column as they arrive, the DataFrame is built once
+    # at the end with proper dtypes instead of from a list of dicts.
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, row):
+        for name, value in row.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * self.length
+            column.append(value)
+        self.length += 1
+        if len(row) != len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.length:
+                    column.append(None)
+
+    def extend(self, other):
+        for name, values in other.columns.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * self.length
+            column.extend(values)
+        self.length += other.length
+        for column in self.columns.values():
+            if len(column) < self.length:
+                column.extend([None] * (self.length - len(column)))
+        return self
+
+    def get(self, name):
+        return self.columns.get(name, [None] * self.length)
+
+    def unique(self, name):
+        # First row for each value of `name`, rows without one are all kept
+        if name not in self.columns:
+            return self
+        seen = set()
+        keep = []
+        for i, value in enumerate(self.columns[name]):
+            if value is None or value not in seen:
+                seen.add(value)
+                keep.append(i)
+        if len(keep) == self.length:
+            return self
+        records = RecordColumns()
+        records.columns = {column: [values[i] for i in keep] for column, values in self.columns.items()}
+        records.length = len(keep)
+        return records
+
+    def rows(self):
+        names = list(self.columns)
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+def typed_column(name, values):
+    if name in CATEGORY_FIELDS:
+        return pd.Categorical(values)
+    if name in SMALL_INT_FIELDS:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("Int8")
+    if name.endswith("_at") or name.endswith("_on"):
+        series = pd.Series(values, dtype=object)
+        times = pd.to_datetime(series, format=DATETIME_FORMAT, errors="coerce")
+        # Leave the column alone if it turns out not to hold timestamps
+        if times.notna().any() or not series.replace("", None).notna().any():
+            return times
+        return series
+    return pd.Series(values, dtype=object)
+
+
+def build_frame(records):
+    if len(records) == 0:
+        return pd.DataFrame()
+    return pd.DataFrame({name: typed_column(name, values) for name, values in records.columns.items()})
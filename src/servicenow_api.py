@@ -0,0 +1,399 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from urllib3.util.retry import Retry
+
+from bucketing import GRANULARITIES, period_range
+from instrumentation import DISABLED
+from query_cache import get_query_cache, normalize_query
+from records import CATEGORY_FIELDS, RecordColumns, build_frame, iter_results
+from sync_store import get_sync_store
+
+INCIDENT_FIELDS = "state,short_description,business_service.name,number,priority,u_prob_type,category,assignment_group.name,sys_created_on,opened_at,closed_at,closed_by.employee_number,closed_by.user_name,closed_by.name,assigned_to.employee_number,assigned_to.user_name,assigned_to.name,sys_updated_on,impact"
+REQUEST_FIELDS = "state,short_description,business_service.name,number,priority,category,assignment_group.name,sys_created_on,opened_at,closed_at,closed_by.employee_number,closed_by.user_name,closed_by.name,assigned_to.employee_number,assigned_to.user_name,assigned_to.name,sys_updated_on,impact"
+
+# Large windows are split into sysparm_offset/sysparm_limit pages which are
+# fetched PAGE_WORKERS at a time. Queries sort on opened_at, then sys_id:
+# tickets created while the pages are read sort after the ones already in the
+# window, so offsets mostly stay put. Offsets on a live table can still shift
+# at page boundaries, the stitched rows are de-duplicated on number.
+PAGE_SIZE = 5000
+PAGE_WORKERS = 4
+# Keep-alive connections per instance. "Load all" nests pools (ticket types x
+# sub-queries x pages, up to 3 x 4 x 4 threads); threads beyond this wait
+# for a free connection rather than opening one that is thrown away after.
+MAX_CONNECTIONS = 16
+
+# Connection defaults, each can be overridden from st.secrets
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 1
+REQUESTS_PER_SECOND = 10
+SYNC_DB_PATH = "servicenow_sync.db"
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_MB = 512
+
+# Aggregate API breakdown of the per-period counts ("counts only" mode)
+STATS_GROUP_BY = "priority,assignment_group.name"
+# Counts only mode sends one small request per period and series (~120 for a
+# chart of 60 periods). They get their own token bucket, so they neither wait
+# behind nor starve the page fetches, and run STATS_WORKERS at a time.
+STATS_REQUESTS_PER_SECOND = 25
+STATS_WORKERS = 8
+STATS_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class FetchError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    # Token bucket shared by every session talking to the same instance
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+@st.cache_resource
+def get_session(base_url, username, password, max_retries, backoff_factor):
+    # One keep-alive session per instance, reused across reruns and sessions
+    # so repeated loads skip the TCP/TLS handshake. Retries back off
+    # exponentially and wait for Retry-After on 429/503.
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=PAGE_WORKERS, pool_maxsize=MAX_CONNECTIONS, pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.auth = (username, password)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+@st.cache_resource
+def get_rate_limiter(base_url, requests_per_second):
+    return RateLimiter(requests_per_second)
+
+
+class ServiceNowAPI:
+    def __init__(self, refresh_cache=False, config=None):
+        # config defaults to st.secrets, any mapping with the same keys works
+        # (the offline benchmarks point it at the local mock instance)
+        config = st.secrets if config is None else config
+        self.refresh_cache = refresh_cache
+        self.metrics = DISABLED
+        self.base_url = config['API_ENDPOINT']
+        # Aggregate API, next to the Table API unless configured otherwise
+        self.stats_url = config.get('STATS_ENDPOINT') or re.sub(r"/table/?$", "/stats", self.base_url)
+        self.auth = (config['USER_NAME'], config['PASSWORD'])
+        self.timeout = (
+            float(config.get('CONNECT_TIMEOUT', CONNECT_TIMEOUT)),
+            float(config.get('READ_TIMEOUT', READ_TIMEOUT)),
+        )
+        self.session = get_session(
+            self.base_url, *self.auth,
+            int(config.get('MAX_RETRIES', MAX_RETRIES)),
+            float(config.get('BACKOFF_FACTOR', BACKOFF_FACTOR)),
+        )
+        self.rate_limiter = get_rate_limiter(
+            self.base_url, float(config.get('REQUESTS_PER_SECOND', REQUESTS_PER_SECOND))
+        )
+        self.stats_rate_limiter = get_rate_limiter(
+            self.stats_url, float(config.get('STATS_REQUESTS_PER_SECOND', STATS_REQUESTS_PER_SECOND))
+        )
+        # Local incremental copy of the ticket tables, SYNC_DB_PATH="" turns it off
+        sync_path = config.get('SYNC_DB_PATH', SYNC_DB_PATH)
+        self.store = get_sync_store(sync_path) if sync_path else None
+        self.query_cache = get_query_cache(
+            float(config.get('QUERY_CACHE_TTL', QUERY_CACHE_TTL)),
+            int(float(config.get('QUERY_CACHE_MB', QUERY_CACHE_MB)) * 1024 * 1024),
+        )
+
+    def fetch_page(self, url, offset, limit=PAGE_SIZE):
+        separator = "&" if "?" in url else "?"
+        page_url = f"{url}{separator}sysparm_limit={limit}&sysparm_offset={offset}"
+        self.rate_limiter.acquire()
+        return self.session.get(page_url, timeout=self.timeout, stream=True)
+
+    def read_page(self, table_name, url, offset):
+        with self.metrics.stage("request", table=table_name):
+            response = self.fetch_page(url, offset)
+        # The body is parsed while it streams in, rows go straight into columns
+        with response, self.metrics.stage("decode", table=table_name) as stage:
+            if response.status_code != 200:
+                raise FetchError(response.status_code)
+            page = RecordColumns()
+            for row in iter_results(response):
+                page.append(row)
+            stage.set(rows=len(page), bytes=response.raw.tell())
+            return page, response.headers.get("X-Total-Count")
+
+    def fetch_pages(self, table_name, query_params=None):
+        if query_params==None:
+            url = f"{self.base_url}/{table_name}"
+        else:
+            url = f"{self.base_url}/{table_name}{query_params}"
+        # st.write(url)
+        records, total = self.read_page(table_name, url, 0)
+        if len(records) < PAGE_SIZE:
+            return records
+
+        if total is None:
+            # Without a total count the remaining pages have to be walked one by one
+            while True:
+                page, _ = self.read_page(table_name, url, len(records))
+                records.extend(page)
+                if len(page) < PAGE_SIZE:
+                    return records.unique("number")
+
+        # Pages are read on worker threads and stitched back in offset order,
+        # errors are re-raised on the script thread.
+        offsets = range(PAGE_SIZE, int(total), PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+            for page, _ in pool.map(lambda offset: self.read_page(table_name, url, offset), offsets):
+                records.extend(page)
+        return records.unique("number")
+
+    def fetch_window(self, table_name, fields, scope, start_date, end_date, updated_since=None):
+        # Raises FetchError instead of reporting it, callers that keep state
+        # (the sync store) need to know a window was not read.
+        query = f"opened_at>={start_date}^opened_at<={end_date}"
+        if scope:
+            query = f"{scope}^{query}"
+        if updated_since:
+            query = f"{query}^sys_updated_on>={updated_since}"
+        params = f"sysparm_query={query}^ORDERBYopened_at^ORDERBYsys_id"
+        if fields:
+            params = f"sysparm_fields={fields}&{params}"
+        with self.metrics.stage("fetch", memory=True, table=table_name) as stage:
+            records = self.fetch_pages(table_name, f"?{params}")
+            stage.set(rows=len(records))
+        return records
+
+    def load_window(self, table_name, fields, scope, start_date, end_date):
+        key = (self.base_url, table_name, fields, normalize_query(scope), start_date, end_date)
+        with self.metrics.stage("load", table=table_name) as stage:
+            df = self.query_cache.get_or_load(
+                key, lambda: self.load_uncached(table_name, fields, scope, start_date, end_date), self.refresh_cache
+            )
+            stage.set(rows=len(df))
+        return df
+
+    def load_uncached(self, table_name, fields, scope, start_date, end_date):
+        try:
+            if self.store is None:
+                records = self.fetch_window(table_name, fields, scope, start_date, end_date)
+            else:
+                with self.metrics.stage("sync", table=table_name) as stage:
+                    records = self.store.load(self, table_name, fields, scope, start_date, end_date)
+                    stage.set(rows=len(records))
+        except (FetchError, requests.RequestException) as e:
+            st.error(f"Failed to fetch data from {table_name}: {e}")
+            if self.store is None:
+                return pd.DataFrame()
+            records = self.store.read(table_name, fields, scope, start_date, end_date)
+        with self.metrics.stage("frame", memory=True, table=table_name) as stage:
+            df = build_frame(records)
+            stage.set(rows=len(df))
+        return df
+
+    def get_stats(self, table_name, params):
+        self.stats_rate_limiter.acquire()
+        with self.metrics.stage("stats", table=table_name):
+            response = self.session.get(f"{self.stats_url}/{table_name}?{params}", timeout=self.timeout)
+        if response.status_code != 200:
+            raise FetchError(response.status_code)
+        return response.json()["result"]
+
+    def fetch_stats(self, table_name, query, group_by=None):
+        # Aggregate API: [(group values, count)], one entry per group_by combination
+        params = f"sysparm_count=true&sysparm_query={query}"
+        if group_by:
+            params = f"{params}&sysparm_group_by={group_by}"
+        result = self.get_stats(table_name, params)
+        if isinstance(result, dict):
+            result = [result]  # not grouped: a single count
+        return [
+            ({field["field"]: field["value"] for field in item.get("groupby_fields", [])}, int(item["stats"]["count"]))
+            for item in result
+        ]
+
+    def fetch_min(self, table_name, query, field):
+        # Aggregate API: smallest value of `field` over the query, None if nothing matches
+        stats = self.get_stats(table_name, f"sysparm_min_fields={field}&sysparm_query={query}")["stats"]
+        return stats.get("min", {}).get(field) or None
+
+    def window_query(self, scope, start_date, end_date):
+        window = f"opened_at>={start_date}^opened_at<={end_date}"
+        return f"{scope}^{window}" if scope else window
+
+    def count_initial_backlog(self, table_name, scopes, start_date, end_date):
+        # Open tickets at the end of the first week with an opened ticket,
+        # over all sub-queries together: the weekly figure the charts no
+        # longer carry once they are drawn per month or quarter
+        windows = [self.window_query(scope, start_date, end_date) for scope in scopes]
+        firsts = [first for first in (self.fetch_min(table_name, window, "opened_at") for window in windows) if first]
+        if not firsts:
+            return 0
+        boundary = (pd.Timestamp(min(firsts)).to_period("W") + 1).start_time.strftime(STATS_DATE_FORMAT)
+        backlog = 0
+        for window in windows:
+            for _, opened in self.fetch_stats(table_name, f"{window}^opened_at<{boundary}"):
+                backlog += opened
+            for _, closed in self.fetch_stats(table_name, f"{window}^closed_at<{boundary}"):
+                backlog -= closed
+        return backlog
+
+    def count_window(self, table_name, scope, start_date, end_date, granularity="W"):
+        # Opened and closed counts per period (week, month or quarter),
+        # priority and assignment group of the tickets opened in the window,
+        # plus how many of them were closed inside it. The Aggregate API cannot
+        # group on a date bucket, so every period of each series is one small
+        # request; they run STATS_WORKERS at a time. The closed-in-range total
+        # is a single request over the whole range.
+        window = self.window_query(scope, start_date, end_date)
+        period_freq = GRANULARITIES[granularity][0]
+        opened_jobs = [("Opened", "opened_at", start) for start in period_range(start_date, end_date, granularity)]
+
+        def count(job):
+            kind, field, start = job
+            if start is None:
+                query = f"{window}^closed_at>={start_date}^closed_at<={end_date}"
+            else:
+                end = (start.to_period(period_freq) + 1).start_time.strftime(STATS_DATE_FORMAT)
+                query = f"{window}^{field}>={start.strftime(STATS_DATE_FORMAT)}^{field}<{end}"
+            return [
+                {"kind": kind, "period": start, **groups, "count": total}
+                for groups, total in self.fetch_stats(table_name, query, STATS_GROUP_BY)
+            ]
+
+        with self.metrics.stage("count", table=table_name) as stage:
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(max_workers=STATS_WORKERS, initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+                rows = [row for result in pool.map(count, opened_jobs) for row in result]
+                # Nothing closes before it is opened: the closed series starts
+                # at the first period with an opened ticket, and is not needed
+                # at all when nothing was opened
+                first = min((row["period"] for row in rows), default=None)
+                closed_jobs = [] if first is None else [
+                    ("Closed", "closed_at", start) for start in period_range(first, pd.Timestamp.today(), granularity)
+                ]
+                if closed_jobs:
+                    closed_jobs.append(("Closed in range", "closed_at", None))
+                rows += [row for result in pool.map(count, closed_jobs) for row in result]
+            stage.set(rows=len(rows), requests=len(opened_jobs) + len(closed_jobs))
+        counts = pd.DataFrame(rows, columns=["kind", "period", *STATS_GROUP_BY.split(","), "count"])
+        counts["period"] = pd.to_datetime(counts["period"])
+        return counts
+
+    def load_counts(self, table_name, scopes, start_date, end_date, granularity="W"):
+        # count_window for every sub-query, cached like the row loads. Split
+        # filters cover disjoint groups, so their counts add up.
+        if isinstance(scopes, str):
+            scopes = [scopes]
+
+        def load(scope):
+            key = ("stats", self.base_url, table_name, normalize_query(scope), start_date, end_date, granularity)
+            return self.query_cache.get_or_load(
+                key, lambda: self.count_window(table_name, scope, start_date, end_date, granularity), self.refresh_cache
+            )
+
+        def load_initial_backlog():
+            key = ("initial_backlog", self.base_url, table_name, tuple(map(normalize_query, scopes)), start_date, end_date)
+            return self.query_cache.get_or_load(
+                key,
+                lambda: pd.DataFrame([{
+                    "kind": "Initial backlog",
+                    "count": self.count_initial_backlog(table_name, scopes, start_date, end_date),
+                }]),
+                self.refresh_cache,
+            )
+
+        try:
+            frames = [load(scope) for scope in scopes]
+            # Weekly counts carry the first week's backlog already
+            if granularity != "W":
+                frames.append(load_initial_backlog())
+            return pd.concat(frames, ignore_index=True)
+        except (FetchError, requests.RequestException) as e:
+            st.error(f"Failed to fetch counts from {table_name}: {e}")
+            return pd.DataFrame(columns=["kind", "period", *STATS_GROUP_BY.split(","), "count"])
+
+    def load_scopes(self, table_name, fields, scopes, start_date, end_date):
+        # A filter split into several sub-queries: each one is loaded (and
+        # cached) on its own, in parallel, then merged on the ticket number
+        if isinstance(scopes, str):
+            scopes = [scopes]
+        if len(scopes) == 1:
+            return self.load_window(table_name, fields, scopes[0], start_date, end_date)
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS, initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+            frames = list(pool.map(lambda scope: self.load_window(table_name, fields, scope, start_date, end_date), scopes))
+        frames = [frame for frame in frames if len(frame) > 0]
+        if not frames:
+            return pd.DataFrame()
+        merged = pd.concat(frames, ignore_index=True).drop_duplicates("number", ignore_index=True)
+        # concat falls back to object when the categories differ between parts
+        for name in CATEGORY_FIELDS & set(merged.columns):
+            merged[name] = merged[name].astype("category")
+        return merged
+
+    def incident_scopes(self, queryprm):
+        scopes = []
+        for query in [queryprm] if isinstance(queryprm, str) else queryprm:
+            scope = "assignment_group.u_provider_rollup=IBM"
+            if query !="":
+                scope = f"{scope}^{query}"
+            scopes.append(scope)
+        return scopes
+
+    def get_incidents(self, start_date, end_date, queryprm):
+        return self.load_scopes("incident", INCIDENT_FIELDS, self.incident_scopes(queryprm), start_date, end_date)
+
+    def get_service_requests(self, start_date, end_date, queryprm):
+        return self.load_scopes("sc_task", REQUEST_FIELDS, queryprm, start_date, end_date)
+
+    def get_problems(self, start_date, end_date):
+        return self.load_window("problem", None, "sys_created_on", start_date, end_date)
+
+    def count_incidents(self, start_date, end_date, queryprm, granularity="W"):
+        return self.load_counts("incident", self.incident_scopes(queryprm), start_date, end_date, granularity)
+
+    def count_service_requests(self, start_date, end_date, queryprm, granularity="W"):
+        return self.load_counts("sc_task", queryprm, start_date, end_date, granularity)
+
+    def count_problems(self, start_date, end_date, granularity="W"):
+        return self.load_counts("problem", "sys_created_on", start_date, end_date, granularity)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+import streamlit as st
+
+from records import RecordColumns
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    table_name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    number TEXT NOT NULL,
+    opened_at TEXT,
+    sys_updated_on TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (table_name, scope, number)
+);
+CREATE INDEX IF NOT EXISTS records_opened ON records (table_name, scope, opened_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL,
+    high_water TEXT,
+    PRIMARY KEY (table_name, scope)
+);
+"""
+
+
+class SyncStore:
+    # Local SQLite copy of the ticket tables. Rows are kept per (table, scope),
+    # scope being the encoded filter (assignment groups, priority) they were
+    # fetched with, together with the opened_at window already loaded and the
+    # highest sys_updated_on seen. Later loads only ask ServiceNow for rows
+    # updated since that high-water mark, upsert the ones still in scope and
+    # drop the ones that left it.
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def load(self, api, table_name, fields, scope, start_date, end_date):
+        # Fetch errors propagate before any state is written, so a failed
+        # sync is simply retried in full on the next load.
+        scope_key = self.scope_key(fields, scope)
+        state = self.get_state(table_name, scope_key)
+        if state is None:
+            rows = api.fetch_window(table_name, fields, scope, start_date, end_date)
+            self.upsert(table_name, scope_key, rows)
+            self.set_state(table_name, scope_key, start_date, end_date, self.high_water(rows))
+        else:
+            window_start, window_end, high_water = state
+            # Rows already covered only need what changed since the last sync
+            rows = api.fetch_window(table_name, fields, scope, window_start, window_end, high_water)
+            # A ticket moved out of the scope (re-prioritised, reassigned)
+            # no longer matches the query above. Without a high-water mark
+            # that query was a full refetch, so whatever is stored and did
+            # not come back is gone; otherwise list every ticket updated since
+            # the last sync, whatever its scope, and drop the stored ones that
+            # did not come back.
+            if high_water is None:
+                gone = self.numbers(table_name, scope_key)
+            else:
+                gone = api.fetch_window(table_name, "number", None, window_start, window_end, high_water).get("number")
+            self.delete(table_name, scope_key, set(gone) - set(rows.get("number")))
+            # Parts of the requested window outside the covered range are loaded in full
+            if start_date < window_start:
+                rows.extend(api.fetch_window(table_name, fields, scope, start_date, window_start))
+            if end_date > window_end:
+                rows.extend(api.fetch_window(table_name, fields, scope, window_end, end_date))
+            self.upsert(table_name, scope_key, rows)
+            self.set_state(
+                table_name, scope_key,
+                min(start_date, window_start), max(end_date, window_end),
+                max(filter(None, [high_water, self.high_water(rows)]), default=None),
+            )
+        return self.read(table_name, fields, scope, start_date, end_date)
+
+    def scope_key(self, fields, scope):
+        return hashlib.sha1(f"{fields}|{scope}".encode()).hexdigest()
+
+    def high_water(self, rows):
+        return max((value or "" for value in rows.get("sys_updated_on")), default="") or None
+
+    def get_state(self, table_name, scope_key):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT window_start, window_end, high_water FROM sync_state WHERE table_name = ? AND scope = ?",
+                (table_name, scope_key),
+            ).fetchone()
+
+    def set_state(self, table_name, scope_key, window_start, window_end, high_water):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                (table_name, scope_key, window_start, window_end, high_water),
+            )
+
+    def upsert(self, table_name, scope_key, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (table_name, scope_key, row.get("number"), row.get("opened_at"), row.get("sys_updated_on"), json.dumps(row))
+                    for row in rows.rows()
+                ],
+            )
+
+    def numbers(self, table_name, scope_key):
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT number FROM records WHERE table_name = ? AND scope = ?", (table_name, scope_key)
+            )
+            return [number for (number,) in cursor]
+
+    def delete(self, table_name, scope_key, numbers):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM records WHERE table_name = ? AND scope = ? AND number = ?",
+                [(table_name, scope_key, number) for number in numbers],
+            )
+
+    def read(self, table_name, fields, scope, start_date, end_date):
+        scope_key = self.scope_key(fields, scope)
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT data FROM records WHERE table_name = ? AND scope = ? AND opened_at >= ? AND opened_at <= ? ORDER BY number",
+                (table_name, scope_key, start_date, end_date),
+            )
+            records = RecordColumns()
+            for (data,) in cursor:
+                records.append(json.loads(data))
+            return records
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM records")
+            self.conn.execute("DELETE FROM sync_state")
+
+
+@st.cache_resource
+def get_sync_store(path):
+    return SyncStore(path)
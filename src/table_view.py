@@ -0,0 +1,148 @@
+import gzip
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+PAGE_SIZES = [25, 100, 500]
+
+# Exports are written this many rows at a time, so only one chunk exists as
+# text at any moment next to the (compressed) output
+EXPORT_CHUNK_ROWS = 20000
+# label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def plain_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, str) or pd.isna(value):
+        return value
+    return str(value)
+
+
+def plain_values(df):
+    # Text columns should hold text only. Without sysparm_fields ServiceNow
+    # returns reference fields as {"link", "value"} objects next to "" for
+    # empty ones; such columns are turned into text (JSON for the objects) so
+    # they can be sorted, shown and exported.
+    mixed = [
+        name for name, column in df.items()
+        if column.dtype == object and not column.map(lambda value: value is None or isinstance(value, str)).all()
+    ]
+    if not mixed:
+        return df
+    df = df.copy(deep=False)
+    for name in mixed:
+        df[name] = df[name].map(plain_value)
+    return df
+
+
+def sort_key(column):
+    # Compare object columns as text, whatever plain_values left in them
+    if column.dtype == object:
+        return column.where(column.isna(), column.astype(str))
+    return column
+
+
+def filter_rows(df, text):
+    # Rows where any text column contains `text`, ignoring case. Categorical
+    # columns are matched on their categories, not row by row.
+    text = text.strip().lower()
+    if not text:
+        return df
+    mask = np.zeros(len(df), dtype=bool)
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            hits = [value for value in column.cat.categories if text in str(value).lower()]
+            mask |= column.isin(hits).to_numpy()
+        elif pd.api.types.is_string_dtype(column):
+            mask |= column.str.lower().str.contains(text, regex=False, na=False).to_numpy(dtype=bool)
+    return df[mask]
+
+
+def sort_rows(df, column, descending=False):
+    if not column:
+        return df
+    return df.sort_values(column, ascending=not descending, kind="stable", na_position="last", key=sort_key)
+
+
+def export_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    # At least one chunk, an empty frame still exports its header/schema
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def export_file(df, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    out = io.BytesIO()
+    df = plain_values(df)
+    if export_format == "Parquet":
+        # One schema for the whole frame, a column that is empty in the first
+        # chunk must not be typed as null for the rest
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(out, schema) as writer:
+            for chunk in export_chunks(df, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    elif export_format in EXPORT_FORMATS:
+        stream = gzip.GzipFile(fileobj=out, mode="wb") if export_format == "CSV (gzip)" else out
+        for i, chunk in enumerate(export_chunks(df, chunk_rows)):
+            stream.write(chunk.to_csv(header=i == 0).encode())
+        if stream is not out:
+            stream.close()
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return out
+
+
+class TableView:
+    # Paged table of a loaded frame: filtering, sorting and slicing happen
+    # here and only the visible page is sent to the browser. The filtered and
+    # sorted rows are kept between reruns until the filter or sort changes.
+    def __init__(self, df, key, file_stem):
+        self.df = plain_values(df)
+        self.key = key
+        self.file_stem = file_stem
+        self.view_key = None
+        self.view = self.df
+
+    def rows(self, text, column, descending):
+        view_key = (text, column, descending)
+        if view_key != self.view_key:
+            self.view = sort_rows(filter_rows(self.df, text), column, descending)
+            self.view_key = view_key
+        return self.view
+
+    def render(self):
+        key = self.key
+        filter_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+        text = filter_col.text_input("Filter", key=f"{key}_filter", placeholder="Text in any column")
+        column = sort_col.selectbox("Sort by", [""] + list(self.df.columns), key=f"{key}_sort")
+        descending = order_col.toggle("Descending", key=f"{key}_descending")
+        page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+
+        rows = self.rows(text, column, descending)
+        pages = max((len(rows) - 1) // page_size + 1, 1)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+        start = (page - 1) * page_size
+        st.dataframe(rows.iloc[start:start + page_size], use_container_width=True)
+        st.caption(f"Rows {min(start + 1, len(rows))}-{min(start + page_size, len(rows))} of {len(rows)}")
+
+        # Exports are only built when asked for, from the filtered and sorted rows
+        format_col, button_col = st.columns([2, 1])
+        export_format = format_col.selectbox("Export format", list(EXPORT_FORMATS), key=f"{key}_export_format")
+        if button_col.button("Prepare export", key=f"{key}_export"):
+            extension, mime = EXPORT_FORMATS[export_format]
+            with st.spinner("Preparing export..."):
+                data = export_file(rows, export_format)
+            st.download_button(
+                f"Download {len(rows)} rows", data, f"{self.file_stem}.{extension}", mime,
+                key=f"{key}_download", on_click="ignore",
+            )
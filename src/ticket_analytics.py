@@ -0,0 +1,308 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property, partial
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from backlog import backlog_from_counts, backlog_series
+from bucketing import chart_granularity, labelled_counts, period_counts
+from figure_cache import get_figure_cache
+from instrumentation import DISABLED
+from table_view import TableView
+
+
+class TicketSpec:
+    # What differs between the ticket tabs: how to load them and what to call them
+    def __init__(self, key, header, plural, singular, loader, counter, file_name, empty_message=None, filtered=True):
+        self.key = key
+        self.header = header
+        self.plural = plural
+        self.singular = singular
+        self.loader = loader
+        self.counter = counter
+        self.file_name = file_name
+        self.empty_message = empty_message or f"No {singular.lower()} found"
+        # False when the loaders ignore the preset/priority filter
+        self.filtered = filtered
+
+
+TICKET_SPECS = [
+    TicketSpec(
+        "incident", "Incidents", "Incidents", "Incident",
+        lambda api, start_date, end_date, paramquery: api.get_incidents(start_date, end_date, paramquery),
+        lambda api, start_date, end_date, paramquery, granularity: api.count_incidents(start_date, end_date, paramquery, granularity),
+        "incidents.csv",
+    ),
+    TicketSpec(
+        "sc_task", "Service Requests", "Requests", "Request",
+        lambda api, start_date, end_date, paramquery: api.get_service_requests(start_date, end_date, paramquery),
+        lambda api, start_date, end_date, paramquery, granularity: api.count_service_requests(start_date, end_date, paramquery, granularity),
+        "requests.csv",
+    ),
+    TicketSpec(
+        "problem", "Problems", "Problems", "Problem",
+        lambda api, start_date, end_date, paramquery: api.get_problems(start_date, end_date),
+        lambda api, start_date, end_date, paramquery, granularity: api.count_problems(start_date, end_date, granularity),
+        "problems.csv", filtered=False,
+    ),
+]
+
+# granularity -> how the chart expanders name a period
+PERIOD_TITLES = {
+    "W": ("Week (Monday to Sunday)", "Weekly"),
+    "M": ("Month", "Monthly"),
+    "Q": ("Quarter", "Quarterly"),
+}
+
+
+class TicketAnalytics:
+    # Everything the dashboard shows for one loaded dataset. Each stage is
+    # computed on first use and reused by the stages and charts built on it.
+    def __init__(self, spec, data, start_date, end_date, metrics=DISABLED):
+        self.spec = spec
+        self.data = data
+        self.metrics = metrics
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        self.granularity = analytics_granularity(start_date)
+
+    @cached_property
+    def frame(self):
+        with self.stage("parse"):
+            # Loaded frames are shared through the query cache, never modify them in place
+            df = self.data.copy(deep=False)
+            if len(df) > 0:
+                # Make sure the date columns are in datetime format
+                df["opened_at"] = pd.to_datetime(df["opened_at"], errors="coerce")
+                df["closed_at"] = pd.to_datetime(df["closed_at"], errors="coerce")
+            return df
+
+    def stage(self, name):
+        return self.metrics.stage(name, memory=True, table=self.spec.key)
+
+    @cached_property
+    def total_opened(self):
+        opened = self.frame["opened_at"]
+        with self.stage("totals"):
+            return int(((opened >= self.start_date) & (opened <= self.end_date)).sum())
+
+    @cached_property
+    def total_closed(self):
+        closed = self.frame["closed_at"]
+        with self.stage("totals"):
+            return int(((closed >= self.start_date) & (closed <= self.end_date)).sum())
+
+    @cached_property
+    def periods(self):
+        # Opened and closed per period (week, or month/quarter for long
+        # ranges) with the resolution rate
+        frame = self.frame
+        with self.stage("periods"):
+            return with_resolution_rate(period_counts(frame["opened_at"], frame["closed_at"], self.granularity))
+
+    @cached_property
+    def backlog(self):
+        frame = self.frame
+        with self.stage("backlog"):
+            return backlog_series(frame["opened_at"], frame["closed_at"], self.granularity)
+
+    @cached_property
+    def initial_backlog(self):
+        # Open tickets at the end of the first week, whatever granularity the
+        # charts are drawn in
+        if self.granularity == "W":
+            return self.backlog["Backlog"][0]
+        frame = self.frame
+        first_week = backlog_series(frame["opened_at"], frame["closed_at"], "W", end=frame["opened_at"].min())
+        return first_week["Backlog"][0]
+
+    # Figures are reused from the shared figure cache whenever the same
+    # aggregates were drawn before, by this session or another one
+    @cached_property
+    def opened_closed_figure(self):
+        periods = self.periods
+        with self.stage("figures"):
+            return get_figure_cache().get_or_build("opened_closed", periods, opened_closed_chart)
+
+    @cached_property
+    def resolution_figure(self):
+        periods = self.periods
+        with self.stage("figures"):
+            return get_figure_cache().get_or_build("resolution", periods, resolution_chart)
+
+    @cached_property
+    def backlog_figure(self):
+        backlog = self.backlog
+        with self.stage("figures"):
+            return get_figure_cache().get_or_build("backlog", backlog, backlog_chart)
+
+    def is_empty(self):
+        return len(self.frame) == 0
+
+    def render(self):
+        spec = self.spec
+        if self.is_empty():
+            st.markdown(f"<h4>{spec.empty_message}</h4>", unsafe_allow_html=True)
+            return
+
+        st.markdown(f"<h4>Backlog : <span style='color:black'>{self.initial_backlog}</span></h4>", unsafe_allow_html=True)
+        st.markdown(f"<h4>{spec.plural} Opened: <span style='color:black'>{self.total_opened}</span></h4>", unsafe_allow_html=True)
+        st.markdown(f"<h4>{spec.plural} Closed: <span style='color:black'>{self.total_closed}</span></h4>", unsafe_allow_html=True)
+
+        # Not memory tracked, the figure stages inside it reset the peak
+        with self.metrics.stage("render", table=spec.key):
+            self.render_details()
+
+    def render_details(self):
+        spec = self.spec
+        period, adjective = PERIOD_TITLES[self.granularity]
+        with st.expander(f"{spec.plural} Opened and Closed per {period}"):
+            st.plotly_chart(self.opened_closed_figure, use_container_width=True, key=f"{spec.key}_opened_closed")
+        with st.expander(f"{adjective} {spec.singular} Resolution Rate"):
+            st.plotly_chart(self.resolution_figure, use_container_width=True, key=f"{spec.key}_resolution")
+        with st.expander(f"Incremental {adjective} Backlog of Open {spec.plural}"):
+            st.plotly_chart(self.backlog_figure, use_container_width=True, key=f"{spec.key}_backlog")
+        with st.expander(f"{spec.singular} Table"):
+            # A fragment: paging, sorting and exports rerun only the table
+            st.fragment(self.render_table)()
+
+    @cached_property
+    def table_view(self):
+        return TableView(self.frame, self.spec.key, self.spec.file_name.rsplit(".", 1)[0])
+
+    def render_table(self):
+        self.table_view.render()
+
+
+class CountAnalytics(TicketAnalytics):
+    # "Counts only" mode: the same figures built from Aggregate API counts
+    # (see ServiceNowAPI.count_window) instead of the ticket rows. The rows are
+    # only loaded, through load_rows, when the table is asked for.
+    def __init__(self, spec, counts, start_date, end_date, load_rows, metrics=DISABLED):
+        super().__init__(spec, None, start_date, end_date, metrics)
+        self.counts = counts
+        self.load_rows = load_rows
+
+    @cached_property
+    def frame(self):
+        with st.spinner(f"Fetching {self.spec.plural.lower()}, please wait..."):
+            return TicketAnalytics(self.spec, self.load_rows(), self.start_date, self.end_date, self.metrics).frame
+
+    def per_period(self, kind):
+        counts = self.counts[self.counts["kind"] == kind]
+        return counts.groupby("period")["count"].sum()
+
+    @cached_property
+    def total_opened(self):
+        return int(self.per_period("Opened").sum())
+
+    @cached_property
+    def total_closed(self):
+        return int(self.counts.loc[self.counts["kind"] == "Closed in range", "count"].sum())
+
+    @cached_property
+    def periods(self):
+        with self.stage("periods"):
+            opened = self.per_period("Opened")
+            closed = self.per_period("Closed")
+            return with_resolution_rate(labelled_counts(opened[opened > 0], closed[closed > 0], self.granularity))
+
+    @cached_property
+    def backlog(self):
+        with self.stage("backlog"):
+            return backlog_from_counts(self.per_period("Opened"), self.per_period("Closed"), self.granularity)
+
+    @cached_property
+    def breakdown(self):
+        opened = self.counts[self.counts["kind"] == "Opened"]
+        return opened.pivot_table(
+            index="assignment_group.name", columns="priority", values="count", aggfunc="sum", fill_value=0
+        )
+
+    @cached_property
+    def initial_backlog(self):
+        # Weekly, like TicketAnalytics: from the weekly counts, or counted
+        # separately (see ServiceNowAPI.count_initial_backlog) for coarser charts
+        if self.granularity == "W":
+            return self.backlog["Backlog"][0]
+        return int(self.counts.loc[self.counts["kind"] == "Initial backlog", "count"].sum())
+
+    def is_empty(self):
+        return self.total_opened == 0
+
+    def render_details(self):
+        super().render_details()
+        with st.expander(f"{self.spec.plural} Opened by Assignment Group and Priority"):
+            st.dataframe(self.breakdown)
+
+    def render_table(self):
+        # A toggle rather than the expander itself: Streamlit does not report
+        # when an expander is opened
+        if st.toggle(f"Load {self.spec.plural.lower()}", key=f"{self.spec.key}_rows"):
+            super().render_table()
+
+
+def with_resolution_rate(combined):
+    combined["Resolution Rate (%)"] = (combined["Closed"] / combined["Opened"]) * 100
+    return combined
+
+
+def analytics_granularity(start_date):
+    # Charts run from the start date up to today (the backlog does), long
+    # ranges are drawn per month or quarter instead of per week
+    return chart_granularity(start_date, pd.Timestamp.today())
+
+
+# The first column of the aggregates is the period label (Week, Month, ...)
+def opened_closed_chart(periods):
+    label = periods.columns[0]
+    long_df = pd.melt(periods, id_vars=[label], value_vars=["Opened", "Closed"], var_name="Status", value_name="Count")
+    return px.bar(long_df, x=label, y="Count", color="Status", barmode="group")
+
+
+def resolution_chart(periods):
+    fig = px.line(periods, x=periods.columns[0], y="Resolution Rate (%)", markers=True)
+    fig.update_traces(line=dict(color="green", width=3))
+    return fig
+
+
+def backlog_chart(backlog):
+    return px.line(backlog, x=backlog.columns[0], y="Backlog", markers=True)
+
+
+def load_analytics(api, spec, start_date, end_date, paramquery, counts_only=False):
+    # Everything that talks to ServiceNow before the first render happens here
+    if counts_only:
+        counts = spec.counter(api, start_date, end_date, paramquery, analytics_granularity(start_date))
+        load_rows = partial(spec.loader, api, start_date, end_date, paramquery)
+        return CountAnalytics(spec, counts, start_date, end_date, load_rows, api.metrics)
+    data = spec.loader(api, start_date, end_date, paramquery)
+    return TicketAnalytics(spec, data, start_date, end_date, api.metrics)
+
+
+def show_tickets(api, spec, start_date, end_date, paramquery, counts_only=False):
+    st.header(spec.header)
+    if st.button(f"Load {spec.header}"):
+        with st.spinner(f"Fetching {spec.plural.lower()}, please wait..."):
+            analytics = load_analytics(api, spec, start_date, end_date, paramquery, counts_only)
+        analytics.render()
+    # "Load all" renders here
+    return st.container()
+
+
+def show_all_tickets(api, containers, start_date, end_date, paramquery, counts_only=False):
+    # Every ticket type is fetched at the same time, each one is rendered into
+    # its tab as soon as it arrives. Workers get the script context so fetch
+    # errors still reach the page.
+    ctx = get_script_run_ctx()
+    with st.spinner("Fetching all tickets, please wait..."):
+        with ThreadPoolExecutor(max_workers=len(TICKET_SPECS), initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+            futures = {
+                pool.submit(load_analytics, api, spec, start_date, end_date, paramquery, counts_only): container
+                for spec, container in zip(TICKET_SPECS, containers)
+            }
+            for future in as_completed(futures):
+                with futures[future]:
+                    future.result().render()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live in src/ and import each other as top-level modules,
+# the offline Table API mock lives in bench/
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+
+@pytest.fixture
+def mock_instance(request):
+    # A small mock instance per test, tests are free to edit its tables. The
+    # row count can be set through indirect parametrization.
+    from mock_servicenow import MockInstance, serve
+
+    instance = MockInstance(rows=getattr(request, "param", 500))
+    server, base_url = serve(instance)
+    instance.base_url = base_url
+    yield instance
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api(mock_instance):
+    from servicenow_api import ServiceNowAPI
+
+    config = {
+        "API_ENDPOINT": mock_instance.base_url, "USER_NAME": "test", "PASSWORD": "test",
+        "SYNC_DB_PATH": "", "REQUESTS_PER_SECOND": 0, "STATS_REQUESTS_PER_SECOND": 0,
+    }
+    return ServiceNowAPI(config=config)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from backlog import backlog_from_counts, backlog_series
+from bucketing import GRANULARITIES, period_start
+
+
+def test_period_boundaries_are_exclusive():
+    # A ticket closed at Monday 00:00 is still open at the end of the week before
+    opened = ["2025-04-14 00:00:00", "2025-04-20 23:59:59"]
+    closed = [None, "2025-04-21 00:00:00"]
+    backlog = backlog_series(opened, closed, "W", end="2025-04-28")
+    assert backlog["Week"].tolist() == ["2025-04-14 to 2025-04-20", "2025-04-21 to 2025-04-27", "2025-04-28 to 2025-05-04"]
+    assert backlog["Backlog"].tolist() == [2, 1, 1]
+
+
+def test_month_boundaries():
+    opened = ["2025-01-31 23:59:59", "2025-02-01 00:00:00"]
+    closed = ["2025-02-01 00:00:00", None]
+    backlog = backlog_series(opened, closed, "M", end="2025-02-15")
+    assert backlog["Month"].tolist() == ["2025-01", "2025-02"]
+    assert backlog["Backlog"].tolist() == [1, 1]
+
+
+def test_empty():
+    backlog = backlog_series([], [], "W")
+    assert list(backlog.columns) == ["Week", "Backlog"] and len(backlog) == 0
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(0)
+    end = pd.Timestamp("2025-06-30")
+    opened = pd.Series(end - pd.to_timedelta(rng.integers(0, 200 * 86400, 2000), unit="s"))
+    closed = (opened + pd.to_timedelta(rng.integers(0, 40 * 86400, 2000), unit="s")).where(rng.random(2000) < 0.8)
+    closed = closed.where(closed <= end)
+    for granularity in ("W", "M", "Q"):
+        period_freq, range_freq, _ = GRANULARITIES[granularity]
+        backlog = backlog_series(opened, closed, granularity, end=end)
+        starts = pd.date_range(period_start(pd.Series([opened.min()]), granularity)[0], end, freq=range_freq)
+        boundaries = (starts.to_period(period_freq) + 1).start_time
+        expected = [int((opened < b).sum() - (closed < b).sum()) for b in boundaries]
+        assert backlog["Backlog"].tolist() == expected
+
+
+def test_from_counts_matches_rows():
+    # The Aggregate API path: per-period counts give the same backlog as the rows
+    rng = np.random.default_rng(1)
+    end = pd.Timestamp("2025-06-30")
+    opened = pd.Series(end - pd.to_timedelta(rng.integers(0, 300 * 86400, 1000), unit="s"))
+    closed = (opened + pd.to_timedelta(rng.integers(0, 60 * 86400, 1000), unit="s")).where(rng.random(1000) < 0.8)
+    closed = closed.where(closed <= end)
+    for granularity in ("W", "M", "Q"):
+        opened_counts = period_start(opened, granularity).value_counts()
+        closed_counts = period_start(closed.dropna(), granularity).value_counts()
+        expected = backlog_series(opened, closed, granularity, end=end)
+        pd.testing.assert_frame_equal(backlog_from_counts(opened_counts, closed_counts, granularity, end=end), expected)
@@ -0,0 +1,58 @@
+import pytest
+
+from presets import ASSIGNMENT_GROUP_PRESETS, compile_filter, split_in_list
+from servicenow_api import FetchError
+
+START = "2000-01-01 00:00:00"
+END = "2100-01-01 00:00:00"
+
+
+class FailingLookup:
+    # The group lookup fails, as when sys_user_group cannot be read
+    base_url = "http://failing.invalid/api/now/table"
+
+    def fetch_pages(self, table_name, query_params=None):
+        raise FetchError(403)
+
+
+def test_split_in_list():
+    values = [f"{i:032x}" for i in range(200)]
+    queries = split_in_list("assignment_group", values, max_chars=500)
+    assert len(queries) > 1
+    assert all(len(query) <= len("assignment_groupIN") + 500 for query in queries)
+    assert [value for query in queries for value in query[len("assignment_groupIN"):].split(",")] == values
+    assert split_in_list("assignment_group", []) == []
+
+
+def test_compile_filter_all():
+    assert compile_filter(FailingLookup(), "All") == [""]
+    assert compile_filter(FailingLookup(), "All", "1") == ["priority=1"]
+
+
+def window(api, queries):
+    # Numbers of the incidents matching any of the queries
+    frames = [api.fetch_window("incident", "number", query, START, END).get("number") for query in queries]
+    return sorted(number for numbers in frames for number in numbers)
+
+
+@pytest.mark.parametrize("preset", ["Finance", "Quality", "SAP"])
+def test_compile_filter_matches_names(api, mock_instance, preset):
+    # Presets are compiled to sys_id lists that select the same tickets as
+    # the group names; long presets are split into several sub-queries
+    names = ASSIGNMENT_GROUP_PRESETS[preset]
+    queries = compile_filter(api, preset, "3")
+    assert all(query.startswith("priority=3^assignment_groupIN") for query in queries)
+    table = mock_instance.table("incident")
+    expected = table[table["assignment_group.name"].isin(names) & (table["priority"] == "3")]
+    assert window(api, queries) == sorted(expected["number"])
+
+
+@pytest.mark.parametrize("preset", ["Finance", "Quality", "SAP"])
+def test_compile_filter_falls_back_to_names(api, mock_instance, preset):
+    names = ASSIGNMENT_GROUP_PRESETS[preset]
+    queries = compile_filter(FailingLookup(), preset)
+    assert all(query.startswith("assignment_group.nameIN") for query in queries)
+    # "&" in a name must not end the query parameter
+    assert not any("&" in query for query in queries)
+    table = mock_instance.table("incident")
+    assert window(api, queries) == sorted(table.loc[table["assignment_group.name"].isin(names), "number"])
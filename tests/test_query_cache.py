@@ -0,0 +1,126 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from query_cache import QueryCache, normalize_query, result_size
+
+
+def frame(rows=3):
+    return pd.DataFrame({"number": [f"INC{i}" for i in range(rows)]})
+
+
+def test_normalize_query():
+    assert normalize_query("priority=1^^assignment_groupINb,a^") == "priority=1^assignment_groupINa,b"
+
+
+def test_result_size_rejects_other_types():
+    assert result_size(frame()) > 0
+    with pytest.raises(TypeError):
+        result_size([{"number": "INC1"}])
+
+
+def test_cached_until_refresh():
+    cache = QueryCache(ttl=60, max_bytes=1 << 20)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return frame()
+
+    first = cache.get_or_load("key", loader)
+    assert cache.get_or_load("key", loader) is first
+    assert len(calls) == 1
+    cache.get_or_load("key", loader, refresh=True)
+    assert len(calls) == 2
+
+
+def test_empty_results_are_not_cached():
+    cache = QueryCache(ttl=60, max_bytes=1 << 20)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return frame(0)
+
+    cache.get_or_load("key", loader)
+    cache.get_or_load("key", loader)
+    assert len(calls) == 2
+
+
+def run_waiters(cache, loader, started, count=4):
+    # Loads `key` on `count` threads once the first loader call has started
+    results = []
+    owner = threading.Thread(target=lambda: results.append(attempt(cache, loader)))
+    owner.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(attempt(cache, loader))) for _ in range(count - 1)]
+    for thread in waiters:
+        thread.start()
+    return owner, waiters, results
+
+
+def attempt(cache, loader):
+    try:
+        return cache.get_or_load("key", loader)
+    except RuntimeError as e:
+        return e
+
+
+def wait_for_waiters(cache, waiters):
+    # Waiters block on the in-flight future without touching the loader
+    for thread in waiters:
+        thread.join(timeout=0.2)
+    assert "key" in cache.in_flight
+
+
+def test_single_flight():
+    cache = QueryCache(ttl=60, max_bytes=1 << 20)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    result = frame()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return result
+
+    owner, waiters, results = run_waiters(cache, loader, started)
+    wait_for_waiters(cache, waiters)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 4 and all(r is result for r in results)
+    assert cache.in_flight == {}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = QueryCache(ttl=60, max_bytes=1 << 20)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait()
+        raise RuntimeError("fetch failed")
+
+    owner, waiters, results = run_waiters(cache, loader, started)
+    wait_for_waiters(cache, waiters)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 4 and all(isinstance(r, RuntimeError) for r in results)
+    assert cache.in_flight == {}
+    # The next load tries again
+    assert len(cache.get_or_load("key", frame)) == 3
+
+
+def test_uncacheable_result_raises():
+    cache = QueryCache(ttl=60, max_bytes=1 << 20)
+    with pytest.raises(TypeError):
+        cache.get_or_load("key", lambda: [{"number": "INC1"}])
+    assert cache.in_flight == {}
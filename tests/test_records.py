@@ -0,0 +1,102 @@
+import json
+import random
+
+import pytest
+
+from records import RecordColumns, build_frame, iter_results
+
+
+class ChunkedResponse:
+    # Stands in for a streamed requests.Response, split at the given sizes
+    def __init__(self, body, sizes):
+        self.body = body
+        self.sizes = sizes
+
+    def iter_content(self, chunk_size=None):
+        pos = 0
+        for size in self.sizes:
+            if pos >= len(self.body):
+                return
+            yield self.body[pos:pos + size]
+            pos += size
+        if pos < len(self.body):
+            yield self.body[pos:]
+
+
+def random_sizes(body, rng, largest):
+    sizes = []
+    while sum(sizes) < len(body):
+        sizes.append(rng.randint(1, largest))
+    return sizes
+
+
+ROWS = [
+    {"number": f"INC{i:07d}", "short_description": f"Ünïcødé ✓ {'€' * (i % 5)} \"quoted\" [x] {{y}}", "priority": str(i % 4 + 1)}
+    for i in range(80)
+]
+
+
+@pytest.mark.parametrize("largest", [1, 2, 7, 64, 1024, 64 * 1024])
+def test_iter_results_any_chunk_boundaries(largest):
+    rng = random.Random(largest)
+    body = json.dumps({"result": ROWS}, ensure_ascii=False).encode()
+    for _ in range(3):
+        assert list(iter_results(ChunkedResponse(body, random_sizes(body, rng, largest)))) == ROWS
+
+
+def test_iter_results_whitespace_and_leading_keys():
+    body = b'{"meta": {"result": 1},\n  "result" :\n [ {"a": 1} ,\n\t{"a": 2}\n ] }'
+    assert list(iter_results(ChunkedResponse(body, [3] * 100))) == [{"a": 1}, {"a": 2}]
+
+
+def test_iter_results_empty_result():
+    body = b'{"result": []}'
+    assert list(iter_results(ChunkedResponse(body, [1] * len(body)))) == []
+    assert len(build_frame(RecordColumns())) == 0
+
+
+def test_record_columns_missing_keys():
+    records = RecordColumns()
+    records.append({"number": "INC1", "priority": "1"})
+    records.append({"number": "INC2"})
+    records.append({"number": "INC3", "state": "2"})
+    assert len(records) == 3
+    assert records.get("priority") == ["1", None, None]
+    assert records.get("state") == [None, None, "2"]
+    assert records.get("closed_at") == [None, None, None]
+    assert list(records.rows())[1] == {"number": "INC2", "priority": None, "state": None}
+
+
+def test_record_columns_extend_aligns_columns():
+    first = RecordColumns()
+    first.append({"number": "INC1", "priority": "1"})
+    second = RecordColumns()
+    second.append({"number": "INC2", "state": "2"})
+    second.append({"number": "INC3", "state": "3"})
+    merged = first.extend(second)
+    assert merged is first
+    assert len(merged) == 3
+    assert merged.get("number") == ["INC1", "INC2", "INC3"]
+    assert merged.get("priority") == ["1", None, None]
+    assert merged.get("state") == [None, "2", "3"]
+
+
+def test_record_columns_unique_keeps_rows_without_key():
+    records = RecordColumns()
+    for row in [{"number": "INC1"}, {"number": None}, {"number": "INC1", "state": "2"}, {"number": None}]:
+        records.append(row)
+    unique = records.unique("number")
+    assert unique.get("number") == ["INC1", None, None]
+    assert unique.get("state") == [None, None, None]
+    assert records.unique("sys_id") is records
+
+
+def test_build_frame_types():
+    records = RecordColumns()
+    records.append({"number": "INC1", "priority": "1", "impact": "2", "opened_at": "2025-04-14 10:00:00", "closed_at": ""})
+    records.append({"number": "INC2", "priority": "3", "impact": "", "opened_at": "2025-04-15 11:30:00"})
+    df = build_frame(records)
+    assert str(df["priority"].dtype) == "category"
+    assert str(df["impact"].dtype) == "Int8"
+    assert df["opened_at"].dt.day.tolist() == [14, 15]
+    assert df["closed_at"].isna().all()
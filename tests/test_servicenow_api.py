@@ -0,0 +1,37 @@
+import pytest
+
+from records import RecordColumns
+from servicenow_api import PAGE_SIZE
+
+ROWS = 2 * PAGE_SIZE + 123
+QUERY = "?sysparm_fields=number,opened_at&sysparm_query=ORDERBYopened_at^ORDERBYsys_id"
+
+
+def columns(rows):
+    records = RecordColumns()
+    for row in rows:
+        records.append(row)
+    return records
+
+
+@pytest.mark.parametrize("mock_instance", [ROWS], indirect=True)
+@pytest.mark.parametrize("total_count", [True, False])
+def test_fetch_pages(api, mock_instance, total_count):
+    # With X-Total-Count the pages are read in parallel, without it one by one
+    mock_instance.total_count = total_count
+    records = api.fetch_pages("incident", QUERY)
+    table = mock_instance.table("incident").sort_values(["opened_at", "sys_id"], kind="stable")
+    assert len(records) == ROWS
+    assert records.get("number") == table["number"].tolist()
+
+
+def test_fetch_pages_drops_duplicates(api, monkeypatch):
+    # A ticket created while paging shifts the later offsets by one row, the
+    # last row of the first page comes back again at the top of the second
+    first = [{"number": f"INC{i:07d}"} for i in range(PAGE_SIZE)]
+    second = [{"number": f"INC{i:07d}"} for i in range(PAGE_SIZE - 1, PAGE_SIZE + 10)]
+    pages = {0: first, PAGE_SIZE: second}
+    monkeypatch.setattr(api, "read_page", lambda table_name, url, offset: (columns(pages[offset]), str(PAGE_SIZE + 10)))
+    records = api.fetch_pages("incident", QUERY)
+    assert records.get("number") == [f"INC{i:07d}" for i in range(PAGE_SIZE + 10)]
+
@@ -0,0 +1,64 @@
+from sync_store import SyncStore
+
+FIELDS = "number,priority,opened_at,sys_updated_on"
+SCOPE = "priority=3"
+START = "2000-01-01 00:00:00"
+END = "2100-01-01 00:00:00"
+
+
+def record_calls(api):
+    # Scopes of every fetch_window call, None for the unscoped listing
+    calls = []
+    fetch_window = api.fetch_window
+
+    def recording(table_name, fields, scope, *args):
+        calls.append(scope)
+        return fetch_window(table_name, fields, scope, *args)
+
+    api.fetch_window = recording
+    return calls
+
+
+def edit(instance, number, **values):
+    table = instance.table("incident")
+    row = table.index[table["number"] == number][0]
+    for name, value in values.items():
+        table.loc[row, name] = value
+    instance.matches.clear()
+
+
+def test_incremental_merge_and_scope_leave(api, mock_instance):
+    store = SyncStore(":memory:")
+    numbers = store.load(api, "incident", FIELDS, SCOPE, START, END).get("number")
+    table = mock_instance.table("incident")
+    assert sorted(numbers) == sorted(table.loc[table["priority"] == "3", "number"])
+
+    later = "2099-01-01 00:00:00"
+    changed, moved = numbers[:2]
+    edit(mock_instance, changed, sys_updated_on=later)
+    edit(mock_instance, moved, priority="1", sys_updated_on=later)
+    calls = record_calls(api)
+    records = store.load(api, "incident", FIELDS, SCOPE, START, END)
+
+    # One scoped query for what changed, one unscoped listing for what left
+    assert calls == [SCOPE, None]
+    rows = {row["number"]: row for row in records.rows()}
+    assert rows[changed]["sys_updated_on"] == later
+    assert moved not in rows
+    assert len(rows) == len(numbers) - 1
+    assert store.get_state("incident", store.scope_key(FIELDS, SCOPE))[2] == later
+
+
+def test_full_refetch_without_high_water(api, mock_instance):
+    store = SyncStore(":memory:")
+    numbers = store.load(api, "incident", FIELDS, SCOPE, START, END).get("number")
+    # A window that came back empty left no high-water mark
+    store.set_state("incident", store.scope_key(FIELDS, SCOPE), START, END, None)
+
+    edit(mock_instance, numbers[0], priority="1")
+    calls = record_calls(api)
+    records = store.load(api, "incident", FIELDS, SCOPE, START, END)
+
+    # The scoped query is already a full refetch, nothing unscoped is listed
+    assert calls == [SCOPE]
+    assert sorted(records.get("number")) == sorted(numbers[1:])
@@ -0,0 +1,36 @@
+import gzip
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from table_view import export_file, sort_rows
+
+
+def test_parquet_first_chunk_null():
+    # A column that is empty throughout the first chunk keeps the type of the
+    # rest of the frame instead of being written as null
+    df = pd.DataFrame({
+        "number": [f"INC{i}" for i in range(10)],
+        "closed_at": [None] * 4 + [f"2025-01-0{i}" for i in range(1, 7)],
+        "reopen_count": [None] * 4 + list(range(6)),
+    })
+    out = export_file(df, "Parquet", chunk_rows=4)
+    table = pq.read_table(io.BytesIO(out.getvalue()))
+    assert table.num_rows == 10
+    assert str(table.schema.field("closed_at").type) == "string"
+    assert table.column("closed_at").to_pylist() == df["closed_at"].tolist()
+
+
+def test_mixed_values_export():
+    # Reference objects next to "" are exported as text
+    df = pd.DataFrame({"assigned_to": [{"link": "x", "value": "1"}, "", None], "count": [1, 2, 3]})
+    table = pq.read_table(io.BytesIO(export_file(df, "Parquet", chunk_rows=2).getvalue()))
+    assert table.column("assigned_to").to_pylist() == ['{"link": "x", "value": "1"}', "", None]
+    text = gzip.decompress(export_file(df, "CSV (gzip)", chunk_rows=2).getvalue()).decode()
+    assert text.splitlines()[0] == ",assigned_to,count" and len(text.splitlines()) == 4
+
+
+def test_sort_rows_mixed_types():
+    df = pd.DataFrame({"value": ["b", 1, None, "a"]})
+    assert sort_rows(df, "value")["value"].tolist() == [1, "a", "b", None]